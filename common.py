@@ -3,14 +3,27 @@
 
 import os
 import re
+import sys
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from operator import itemgetter
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 
-AUDIO_EXTS = {".wav", ".aif", ".aiff", ".flac"}
+try:
+    import hyperscan
+except ImportError:  # optional, pure-Python regex fallback
+    hyperscan = None
+
+AUDIO_EXT_NOSET = {"wav", "aif", "aiff", "flac"}
 LAYER_LIMIT_PER_PAD = 8
 
+# Category names are interned so kit dict lookups and comparisons
+# against OTHER mostly resolve on identity.
+OTHER = sys.intern("other")
+
 
 # ============================================================
 # Data model
@@ -19,7 +32,7 @@ LAYER_LIMIT_PER_PAD = 8
 @dataclass(frozen=True)
 class MappingEntry:
     canonical: str
-    synonyms: List[str]
+    synonyms: Tuple[str, ...]
     midi_notes: Optional[List[int]] = None
 
 
@@ -44,7 +57,7 @@ def parse_mapping_file(file_path: str) -> Dict[str, MappingEntry]:
                 left = line.strip().lower()
                 right = None
 
-            synonyms = [x.strip() for x in left.split("/") if x.strip()]
+            synonyms = tuple(sys.intern(x.strip()) for x in left.split("/") if x.strip())
             canonical = synonyms[0]
 
             midi_notes = None
@@ -63,53 +76,211 @@ def parse_mapping_file(file_path: str) -> Dict[str, MappingEntry]:
     return mapping
 
 
-def mapping_to_nomenclature(mapping: Dict[str, MappingEntry]) -> Dict[str, List[str]]:
-    return {k: v.synonyms for k, v in mapping.items()}
+def mapping_to_nomenclature(mapping: Dict[str, MappingEntry]) -> Dict[str, Tuple[str, ...]]:
+    return {sys.intern(k): v.synonyms for k, v in mapping.items()}
 
 
 # ============================================================
 # Detection helpers
 # ============================================================
 
-def detect_category(filename: str, nomenclature: Dict[str, List[str]]) -> str:
-    name = filename.lower()
-    for canonical, synonyms in nomenclature.items():
-        for word in synonyms:
-            if re.search(rf"\b{re.escape(word)}\b", name):
-                return canonical
-    return "other"
+# A whitespace-separated index ('Kick 808X 12') can be dropped before
+# classification without changing any \b match; digits glued to a word
+# ('Kick808') cannot, so they are only cleaned out of the kit name.
+_INDEX_RE = re.compile(r"\s+\d+$")
+_KIT_NAME_CLEAN_RE = re.compile(r"\s*\d+\s*$|\s+")
+
+
+def build_master_regex(nomenclature: Dict[str, Tuple[str, ...]]) -> Tuple[re.Pattern, Dict[str, str]]:
+    """
+    Compile the whole nomenclature into a single pattern.
+
+    Each category is a named lookahead group (c0, c1, ...) tried in mapping
+    file order, so the first category of the file wins, as before, and the
+    group span locates the synonym to strip from the kit name.
+    Returns (pattern, group name -> canonical category).
+    """
+    groups = {}
+    alternatives = []
+    for i, (canonical, synonyms) in enumerate(nomenclature.items()):
+        if not synonyms:
+            continue
+        name = f"c{i}"
+        groups[name] = canonical
+        words = "|".join(re.escape(w) for w in synonyms)
+        alternatives.append(rf"(?=.*?(?P<{name}>\b(?:{words})\b))")
+
+    if not alternatives:
+        return re.compile(r"(?!)"), groups
+
+    return re.compile("|".join(alternatives), re.IGNORECASE | re.DOTALL), groups
+
+
+def build_hyperscan_db(nomenclature: Dict[str, Tuple[str, ...]]):
+    """
+    Compile every synonym into one Hyperscan database, if available.
+
+    Returns (database, [(category index, synonym index, canonical)] by
+    pattern id), or None when hyperscan is not installed.
+    """
+    if hyperscan is None:
+        return None
 
+    expressions = []
+    patterns = []
+    for ci, (canonical, synonyms) in enumerate(nomenclature.items()):
+        for si, word in enumerate(synonyms):
+            expressions.append(rf"\b{re.escape(word)}\b".encode("utf-8"))
+            patterns.append((ci, si, canonical))
 
-def extract_trailing_index(stem: str) -> Optional[int]:
-    m = re.search(r"\s(\d+)$", stem)
-    if not m:
+    if not expressions:
         return None
-    return int(m.group(1))
-
 
-def extract_kit_name(filename: str, category: str) -> str:
-    stem = Path(filename).stem
-    stem = re.sub(rf"^{re.escape(category)}\s*", "", stem, flags=re.IGNORECASE)
-    stem = re.sub(r"\s*\d+$", "", stem)
-    return stem.strip() or "UNKNOWN"
+    db = hyperscan.Database()
+    db.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(expressions),
+    )
+    return db, patterns
+
+
+def _hyperscan_search(stem: str, hs) -> Optional[Tuple[str, int, int]]:
+    # Same pick as the master regex: first category, then leftmost
+    # match, then first synonym.
+    db, patterns = hs
+    best = None
+
+    def on_match(pattern_id, start, end, flags, context):
+        nonlocal best
+        ci, si, canonical = patterns[pattern_id]
+        rank = (ci, start, si)
+        if best is None or rank < best[0]:
+            best = (rank, canonical, start, end)
+
+    db.scan(stem.encode("ascii"), match_event_handler=on_match)
+    return best[1:] if best else None
+
+
+def classify_stem(
+    stem: str,
+    master: Tuple[re.Pattern, Dict[str, str]],
+    hs=None,
+    index_stripped: bool = False,
+) -> Tuple[str, str]:
+    """
+    Return (category, kit_name) for a file name without extension.
+
+    index_stripped tells that a whitespace-separated trailing index was
+    already removed (see _INDEX_RE), so the kit name must not lose more
+    trailing digits: 'Snare 808 1' and 'Snare 808' -> True give '808'.
+
+    Uses the Hyperscan database from build_hyperscan_db when given. Its
+    word boundaries are ASCII-only, so non-ASCII names always go through
+    the regex.
+    """
+    if hs is not None and stem.isascii():
+        found = _hyperscan_search(stem, hs)
+    else:
+        pattern, groups = master
+        m = pattern.match(stem)
+        found = (groups[m.lastgroup], *m.span(m.lastgroup)) if m else None
+
+    if found:
+        category, start, end = found
+        stem = stem[:start] + stem[end:]
+    else:
+        category = OTHER
+    if index_stripped:
+        kit_name = " ".join(stem.split())
+    else:
+        kit_name = _KIT_NAME_CLEAN_RE.sub(" ", stem).strip()
+    return category, kit_name or "UNKNOWN"
 
 
 # ============================================================
 # Scan
 # ============================================================
 
-def scan_samples(root_folder: str, nomenclature: Dict[str, List[str]]):
+def _scan_dir(path: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    List one directory: returns ([(path, filename) of audio files], [subdirs]).
+
+    The DirEntry type check reuses the dirent data, so no extra stat is
+    needed per file. Symlinked directories are not followed.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    # same rule as Path.suffix: 'wav' and '.wav' have none
+                    head, sep, ext = name.rpartition(".")
+                    if head and sep and ext.lower() in AUDIO_EXT_NOSET:
+                        files.append((entry.path, name))
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def _iter_audio_files(root_folder: str, max_workers: Optional[int] = None):
+    """
+    Yield (path, filename) for every audio file below root_folder.
+
+    Directories are listed concurrently by a thread pool (scandir releases
+    the GIL, which pays off on slow or network-mounted libraries), then
+    replayed in os.walk(topdown=True) order so the output is deterministic.
+    """
+    if max_workers is None:
+        max_workers = (os.cpu_count() or 1) * 4
+
+    listings = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_dir, root_folder): root_folder}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                listings[path] = future.result()
+                for d in listings[path][1]:
+                    pending[pool.submit(_scan_dir, d)] = d
+
+    stack = [root_folder]
+    while stack:
+        files, subdirs = listings[stack.pop()]
+        yield from files
+        stack.extend(reversed(subdirs))
+
+
+def scan_samples(
+    root_folder: str,
+    nomenclature: Dict[str, Tuple[str, ...]],
+    max_workers: Optional[int] = None,
+):
     kits = defaultdict(lambda: defaultdict(list))
+    master = build_master_regex(nomenclature)
+    hs = build_hyperscan_db(nomenclature)
 
-    for root, _, files in os.walk(root_folder):
-        for file in files:
-            if Path(file).suffix.lower() not in AUDIO_EXTS:
-                continue
+    # 'Kick 01.wav' ... 'Kick 64.wav' only differ by their index
+    @lru_cache(maxsize=None)
+    def _classify(key, index_stripped):
+        return classify_stem(key, master, hs, index_stripped)
+
+    for path, file in _iter_audio_files(root_folder, max_workers):
+        stem = file.rsplit(".", 1)[0]
+        key = _INDEX_RE.sub("", stem)
+        category, kit_name = _classify(key, len(key) != len(stem))
 
-            category = detect_category(file, nomenclature)
-            kit_name = extract_kit_name(file, category)
+        kits[kit_name][category].append(path)
 
-            kits[kit_name][category].append(os.path.join(root, file))
+    for elements in kits.values():
+        for category in elements:
+            elements[category] = sort_samples_by_trailing_number(elements[category])
 
     return kits
 
@@ -118,12 +289,19 @@ def scan_samples(root_folder: str, nomenclature: Dict[str, List[str]]):
 # Sorting
 # ============================================================
 
+_TRAIL_RE = re.compile(r"(.*?)\s(\d+)$")
+
+
 def sort_samples_by_trailing_number(paths: List[str]) -> List[str]:
-    def key(p):
-        stem = Path(p).stem
-        idx = extract_trailing_index(stem)
-        return (0, idx) if idx is not None else (1, stem.lower())
-    return sorted(paths, key=key)
+    decorated = []
+    for p in paths:
+        base = os.path.basename(p)
+        stem = base[:base.rfind(".")] if "." in base else base
+        m = _TRAIL_RE.match(stem)
+        key = (0, int(m.group(2))) if m else (1, stem.lower())
+        decorated.append((key, p))
+    decorated.sort(key=itemgetter(0))
+    return [p for _, p in decorated]
 
 
 # ============================================================
@@ -132,8 +310,8 @@ def sort_samples_by_trailing_number(paths: List[str]) -> List[str]:
 
 def kit_stats(elements):
     total = sum(len(v) for v in elements.values())
-    only_other = ("other" in elements and len(elements) == 1)
-    mixed_other = ("other" in elements and len(elements) > 1)
+    only_other = (OTHER in elements and len(elements) == 1)
+    mixed_other = (OTHER in elements and len(elements) > 1)
     return {
         "total": total,
         "only_other": only_other,
@@ -145,7 +323,8 @@ def kit_stats(elements):
 # MIDI helpers
 # ============================================================
 
-def parse_midi_note_list(spec: str) -> List[int]:
+@lru_cache(maxsize=None)
+def parse_midi_note_list(spec: str) -> Tuple[int, ...]:
     notes = set()
     parts = [x.strip() for x in spec.split(",") if x.strip()]
     for part in parts:
@@ -155,14 +334,8 @@ def parse_midi_note_list(spec: str) -> List[int]:
                 notes.add(n)
         else:
             notes.add(int(part))
-    return sorted(notes)
-
-
-def category_capacity(mapping, category):
-    entry = mapping.get(category)
-    if not entry or entry.midi_notes is None:
-        return None
-    return len(entry.midi_notes) * LAYER_LIMIT_PER_PAD
+    # tuple: the cached result is shared between callers
+    return tuple(sorted(notes))
 
 
 # ============================================================
@@ -178,10 +351,23 @@ def filter_kits(
     mapping=None,
     overflow_policy="reject",
     trash_notes=None,
+    pre_sorted=True,
 ):
+    """
+    Split kits into (valid, rejected).
+
+    Kits from scan_samples are already sorted by trailing number; pass
+    pre_sorted=False for kits built another way.
+    """
     valid = {}
     rejected = {}
 
+    capacities = {
+        cat: len(e.midi_notes) * LAYER_LIMIT_PER_PAD
+        for cat, e in (mapping or {}).items()
+        if e.midi_notes is not None
+    }
+
     for kit_name, elements in kits.items():
         stats = kit_stats(elements)
 
@@ -198,14 +384,14 @@ def filter_kits(
             reason = "mixed_other"
 
         overflow_info = []
-        other_count = len(elements.get("other", []))
+        other_count = len(elements.get(OTHER, []))
 
         if mapping:
             for cat, files in elements.items():
-                if cat == "other":
+                if cat == OTHER:
                     continue
 
-                cap = category_capacity(mapping, cat)
+                cap = capacities.get(cat)
                 if cap is not None and len(files) > cap:
                     overflow_info.append({
                         "category": cat,
@@ -241,6 +427,8 @@ def filter_kits(
                 "details": details,
                 "elements": elements
             }
+        elif pre_sorted:
+            valid[kit_name] = elements
         else:
             sorted_elements = {
                 cat: sort_samples_by_trailing_number(files)
@@ -4,6 +4,11 @@
 import argparse
 import json
 
+try:
+    import orjson
+except ImportError:  # optional, stdlib json fallback
+    orjson = None
+
 from common import (
     parse_mapping_file,
     mapping_to_nomenclature,
@@ -14,12 +19,14 @@ from common import (
 )
 
 
-def to_jsonable(obj):
-    if isinstance(obj, dict):
-        return {k: to_jsonable(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [to_jsonable(x) for x in obj]
-    return obj
+def export_json(path, obj):
+    # listings only hold dicts, lists, strings and ints: no conversion needed
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
 
 
 def main():
@@ -77,13 +84,11 @@ def main():
     print(f"\nREJECTED KITS : {len(rejected)}")
 
     if args.export_valid:
-        with open(args.export_valid, "w", encoding="utf-8") as f:
-            json.dump(to_jsonable(valid), f, indent=2, ensure_ascii=False)
+        export_json(args.export_valid, valid)
         print(f"\nValid exported to {args.export_valid}")
 
     if args.export_rejected:
-        with open(args.export_rejected, "w", encoding="utf-8") as f:
-            json.dump(to_jsonable(rejected), f, indent=2, ensure_ascii=False)
+        export_json(args.export_rejected, rejected)
         print(f"\nRejected exported to {args.export_rejected}")
 
 
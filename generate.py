@@ -2,17 +2,21 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import colorsys
 import json
-import math
+import multiprocessing
 import os
 import re
 import random
-import xml.etree.ElementTree as ET
+import tempfile
+from collections import defaultdict
+from functools import lru_cache
 
 from common import (
     parse_mapping_file,
     parse_midi_note_list,
     LAYER_LIMIT_PER_PAD,
+    OTHER,
 )
 
 TALDRUM_VERSION = "13"
@@ -31,6 +35,33 @@ def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates 0600 files; presets get the usual open() permissions
+PRESET_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def write_file_atomic(path: str, data: bytes) -> None:
+    # a crash mid-write leaves the previous preset in place, not half a file;
+    # the temp name is unique so concurrent writers never share it
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb", buffering=1 << 20) as f:
+            f.write(data)
+        os.chmod(tmp, PRESET_FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
 def sanitize_filename(name: str) -> str:
     name = name.strip()
     name = re.sub(r"[\\/:\*\?\"<>\|]+", "_", name)
@@ -38,6 +69,39 @@ def sanitize_filename(name: str) -> str:
     return name or "UNTITLED"
 
 
+def is_case_insensitive_dir(path: str) -> bool:
+    """True if file names in path ignore case (macOS/Windows defaults)."""
+    fd, probe = tempfile.mkstemp(dir=path, prefix=".CaseProbe")
+    os.close(fd)
+    try:
+        head, tail = os.path.split(probe)
+        return os.path.exists(os.path.join(head, tail.swapcase()))
+    finally:
+        os.unlink(probe)
+
+
+def unique_preset_names(kit_names, fold_case: bool = False):
+    """
+    Sanitized preset name for each kit, in listing order.
+
+    Names that would land on the same file get a numbered suffix
+    ("K_", "K_ (2)", ...). With fold_case (case-insensitive output dir),
+    808X and 808x are the same file and collide too.
+    """
+    taken = set()
+    names = []
+    for kit_name in kit_names:
+        base = sanitize_filename(kit_name)
+        name = base
+        n = 2
+        while (name.casefold() if fold_case else name) in taken:
+            name = f"{base} ({n})"
+            n += 1
+        taken.add(name.casefold() if fold_case else name)
+        names.append(name)
+    return names
+
+
 def load_listing_json(listing_path: str) -> dict:
     with open(listing_path, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -56,39 +120,36 @@ def random_pad_colour() -> str:
     TAL Drum 'colour' is stored as a signed 32-bit integer.
     It corresponds to ARGB (0xAARRGGBB).
 
-    We generate vivid colors (avoid gray-ish).
+    We generate vivid colors (avoid gray-ish) directly in HSV space,
+    with saturation and value kept high.
     Alpha is fixed to 255.
     """
-    while True:
-        r = random.randint(0, 255)
-        g = random.randint(0, 255)
-        b = random.randint(0, 255)
+    h = random.random()
+    s = random.uniform(0.55, 1.0)
+    v = random.uniform(0.65, 1.0)
+    r, g, b = (int(x * 255) for x in colorsys.hsv_to_rgb(h, s, v))
 
-        # Avoid near-gray colors
-        if max(r, g, b) - min(r, g, b) < 80:
-            continue
-
-        argb = (255 << 24) | (r << 16) | (g << 8) | b
+    argb = (255 << 24) | (r << 16) | (g << 8) | b
 
-        # Convert to signed 32-bit int
-        if argb >= 2**31:
-            argb -= 2**32
+    # Convert to signed 32-bit int
+    if argb >= 2**31:
+        argb -= 2**32
 
-        return str(argb)
+    return str(argb)
 
 
 # ------------------------------------------------------------
 # Velocity
 # ------------------------------------------------------------
 
-def velocity_ranges(n_layers: int):
+def _velocity_ranges_impl(n_layers: int):
     if n_layers <= 0:
         return []
 
     ranges = []
     for i in range(n_layers):
-        start = math.floor(i * 127 / n_layers) + 1
-        end = math.floor((i + 1) * 127 / n_layers)
+        start = i * 127 // n_layers + 1
+        end = (i + 1) * 127 // n_layers
         if i == n_layers - 1:
             end = 127
         ranges.append((start, end))
@@ -103,14 +164,32 @@ def velocity_ranges(n_layers: int):
     return ranges
 
 
+# Pads hold at most LAYER_LIMIT_PER_PAD layers: every possible answer is
+# computed once at import.
+_VEL_RANGES = [tuple(_velocity_ranges_impl(n)) for n in range(LAYER_LIMIT_PER_PAD + 1)]
+velocity_ranges = _VEL_RANGES.__getitem__
+
+
 # ------------------------------------------------------------
 # Path handling
 # ------------------------------------------------------------
 
-def wav_to_pathrelative(wav_path: str, global_base: str) -> str:
-    wav_abs = os.path.abspath(wav_path)
-    base_abs = os.path.abspath(global_base)
+# The helpers below expect absolute paths: abspath() on a relative path
+# calls getcwd(), so callers resolve the global base / preset dir once per
+# run and each wav through wav_abspath().
 
+@lru_cache(maxsize=None)
+def _abspath(path: str) -> str:
+    return os.path.abspath(path)
+
+
+def wav_abspath(wav_path: str) -> str:
+    # Samples of a kit share a few folders: resolve each folder once.
+    head, tail = os.path.split(wav_path)
+    return os.path.join(_abspath(head), tail)
+
+
+def wav_to_pathrelative(wav_abs: str, base_abs: str) -> str:
     rel = os.path.relpath(wav_abs, base_abs)
 
     if rel.startswith(".."):
@@ -122,9 +201,7 @@ def wav_to_pathrelative(wav_path: str, global_base: str) -> str:
     return rel.replace("\\", "/")
 
 
-def wav_to_path_foldback(wav_path: str, preset_dir: str) -> str:
-    wav_abs = os.path.abspath(wav_path)
-    preset_dir_abs = os.path.abspath(preset_dir)
+def wav_to_path_foldback(wav_abs: str, preset_dir_abs: str) -> str:
     rel = os.path.relpath(wav_abs, preset_dir_abs)
     return rel.replace("\\", "/")
 
@@ -133,134 +210,152 @@ def wav_to_path_foldback(wav_path: str, preset_dir: str) -> str:
 # TAL Drum XML building
 # ------------------------------------------------------------
 
-def make_empty_taldrum_root(preset_path_abs: str, kit_name: str) -> ET.Element:
-    root = ET.Element(
-        "taldrum",
-        {
-            "version": TALDRUM_VERSION,
-            "path": preset_path_abs.replace("\\", "/"),
-            "name": kit_name,
-            "volume": DEFAULT_VOLUME,
-            "panelmode": DEFAULT_PANELMODE,
-        },
-    )
-    ET.SubElement(root, "pads")
-    return root
-
-
-def make_pad(pads_el: ET.Element, pad_index: int, midi_note: int) -> ET.Element:
-    pad_el = ET.SubElement(
-        pads_el,
-        "pad",
-        {
-            "version": TALDRUM_VERSION,
-            "activemappings": "0",
-            "colour": "0",
-            "name": f"Pad {pad_index+1}",
-            "midikey": float_str(midi_note),
-        },
-    )
+# The preset layout is fixed (pad_count pads x LAYER_LIMIT_PER_PAD
+# mappings), so it is rendered from string templates instead of building
+# and serializing an element tree.
+
+TALDRUM_TEMPLATE = (
+    "<?xml version='1.0' encoding='utf-8'?>\n"
+    '<taldrum version="{version}" path="{path}" name="{name}" volume="{volume}" panelmode="{panelmode}">\n'
+    "  <pads>\n"
+    "{pads}"
+    "  </pads>\n"
+    "</taldrum>\n"
+)
 
-    maps_el = ET.SubElement(pad_el, "mappings")
-    for _ in range(LAYER_LIMIT_PER_PAD):
-        ET.SubElement(maps_el, "mapping", {"path": "", "pathrelative": ""})
+PAD_TEMPLATE = (
+    '    <pad version="{version}" activemappings="{am}" colour="{col}" name="Pad {n}" midikey="{key}">\n'
+    "      <mappings>\n"
+    "{maps}"
+    "      </mappings>\n"
+    "    </pad>\n"
+)
 
-    return pad_el
+MAPPING_TEMPLATE = '        <mapping path="{p}" pathrelative="{rel}"{v} />\n'
 
+EMPTY_MAPPING = MAPPING_TEMPLATE.format(p="", rel="", v="")
 
-def build_base_pads(root: ET.Element, base_midi: int, pad_count: int):
-    pads_el = root.find("pads")
-    midi_to_pad = {}
 
-    for i in range(pad_count):
-        note = base_midi + i
-        pad_el = make_pad(pads_el, i, note)
-        midi_to_pad[note] = pad_el
+def xml_attr(value: str) -> str:
+    # Same escaping as ElementTree: quotes stay unescaped, and \r \n \t
+    # become character references so parsers don't normalize them to spaces.
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("\r", "&#13;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#09;")
+    )
 
-    return midi_to_pad
 
+def make_pad(pad_index: int, midi_note: int, maps: str = "", active: int = 0, colour: str = "0") -> str:
+    return PAD_TEMPLATE.format(
+        version=TALDRUM_VERSION,
+        am=active,
+        col=colour,
+        n=pad_index + 1,
+        key=float_str(midi_note),
+        maps=maps or EMPTY_MAPPING * LAYER_LIMIT_PER_PAD,
+    )
 
-def set_pad_layers(pad_el, wav_paths, preset_dir, global_base):
-    maps_el = pad_el.find("mappings")
-    mappings = list(maps_el)
 
+def pad_layers_xml(wav_paths, preset_dir_abs, global_base_abs) -> str:
     n = min(len(wav_paths), LAYER_LIMIT_PER_PAD)
     ranges = velocity_ranges(n)
 
-    # Clear mappings
-    for m in mappings:
-        m.attrib.clear()
-        m.set("path", "")
-        m.set("pathrelative", "")
-
+    parts = []
     for i in range(n):
-        wav = wav_paths[i]
-        m = mappings[i]
-
-        m.set("pathrelative", wav_to_pathrelative(wav, global_base))
-        m.set("path", wav_to_path_foldback(wav, preset_dir))
-
+        wav_abs = wav_abspath(wav_paths[i])
         vstart, vend = ranges[i]
 
         if n == 1:
-            pass
+            v = ""
         elif i == 0:
-            m.set("velocityend", float_str(vend))
+            v = f' velocityend="{float_str(vend)}"'
         elif i == n - 1:
-            m.set("velocitystart", float_str(vstart))
-        else:
-            m.set("velocitystart", float_str(vstart))
-            m.set("velocityend", float_str(vend))
-
-    pad_el.set("activemappings", str(n))
-
-
-def pretty_xml(elem):
-    def indent(e, level=0):
-        i = "\n" + level * "  "
-        if len(e):
-            if not e.text or not e.text.strip():
-                e.text = i + "  "
-            for child in e:
-                indent(child, level + 1)
-            if not e.tail or not e.tail.strip():
-                e.tail = i
+            v = f' velocitystart="{float_str(vstart)}"'
         else:
-            if level and (not e.tail or not e.tail.strip()):
-                e.tail = i
+            v = f' velocitystart="{float_str(vstart)}" velocityend="{float_str(vend)}"'
+
+        parts.append(MAPPING_TEMPLATE.format(
+            p=xml_attr(wav_to_path_foldback(wav_abs, preset_dir_abs)),
+            rel=xml_attr(wav_to_pathrelative(wav_abs, global_base_abs)),
+            v=v,
+        ))
+
+    parts.append(EMPTY_MAPPING * (LAYER_LIMIT_PER_PAD - n))
+    return "".join(parts)
 
-    indent(elem)
-    return ET.tostring(elem, encoding="utf-8", xml_declaration=True).decode("utf-8")
+
+@lru_cache(maxsize=None)
+def empty_pads(base_midi: int, pad_count: int):
+    # Same for every kit of a run: rendered once per process.
+    return tuple(make_pad(i, base_midi + i) for i in range(pad_count))
+
+
+def build_pads(note_to_samples, base_midi, pad_count, preset_dir_abs, global_base_abs) -> str:
+    pads = list(empty_pads(base_midi, pad_count))
+
+    for note, files in note_to_samples.items():
+        i = note - base_midi
+        if not files or not 0 <= i < pad_count:
+            continue
+
+        files = files[:LAYER_LIMIT_PER_PAD]
+        maps = pad_layers_xml(files, preset_dir_abs, global_base_abs)
+        # 🎨 Apply visible random colour
+        pads[i] = make_pad(i, note, maps, len(files), random_pad_colour())
+
+    return "".join(pads)
+
+
+def make_taldrum_xml(preset_path_abs: str, kit_name: str, pads: str) -> str:
+    return TALDRUM_TEMPLATE.format(
+        version=TALDRUM_VERSION,
+        path=xml_attr(preset_path_abs.replace("\\", "/")),
+        name=xml_attr(kit_name),
+        volume=DEFAULT_VOLUME,
+        panelmode=DEFAULT_PANELMODE,
+        pads=pads,
+    )
 
 
 # ------------------------------------------------------------
 # Assignment logic
 # ------------------------------------------------------------
 
-def assign_samples_to_notes(kit_elements, mapping, overflow_policy, trash_notes):
-    note_to_samples = {}
-    warnings = []
+def free_trash_notes(mapping, trash_notes):
+    """Trash notes not already used by a mapped category."""
+    mapped_notes = set().union(*(e.midi_notes or () for e in mapping.values()))
+    return [n for n in trash_notes if n not in mapped_notes]
 
-    mapped_notes = set()
-    for entry in mapping.values():
-        if entry.midi_notes:
-            mapped_notes.update(entry.midi_notes)
 
-    trash_pool = [n for n in trash_notes if n not in mapped_notes]
+def assign_samples_to_notes(kit_elements, mapping, overflow_policy, base_trash_pool):
+    """
+    base_trash_pool comes from free_trash_notes(); it is the same for every
+    kit, so it is computed once by the caller and only read here.
+    """
+    note_to_samples = defaultdict(list)
+    warnings = []
+
+    trash_pool = base_trash_pool
+    head = 0  # first trash note with free layers
 
     def push(note, samples):
-        note_to_samples.setdefault(note, []).extend(samples)
+        note_to_samples[note].extend(samples)
 
     def push_trash(samples):
-        nonlocal trash_pool
+        nonlocal head
         idx = 0
-        while idx < len(samples) and trash_pool:
-            note = trash_pool[0]
+        while idx < len(samples) and head < len(trash_pool):
+            note = trash_pool[head]
             cur = note_to_samples.get(note, [])
             space = LAYER_LIMIT_PER_PAD - len(cur)
 
             if space <= 0:
-                trash_pool.pop(0)
+                head += 1
                 continue
 
             take = samples[idx: idx + space]
@@ -268,13 +363,13 @@ def assign_samples_to_notes(kit_elements, mapping, overflow_policy, trash_notes)
             idx += len(take)
 
             if len(note_to_samples[note]) >= LAYER_LIMIT_PER_PAD:
-                trash_pool.pop(0)
+                head += 1
 
         if idx < len(samples):
             warnings.append(f"Dropped {len(samples)-idx} samples (trash full)")
 
     for category, files in kit_elements.items():
-        if category == "other":
+        if category == OTHER:
             if overflow_policy in ("trash", "ignore"):
                 push_trash(files)
             continue
@@ -304,6 +399,30 @@ def assign_samples_to_notes(kit_elements, mapping, overflow_policy, trash_notes)
 # Main
 # ------------------------------------------------------------
 
+def _generate_one(job):
+    """Build and write one preset. Runs in a multiprocessing.Pool worker."""
+    (kit_safe, kit_elements, mapping, overflow_policy, base_trash_pool,
+     out_dir, global_base_abs, pad_base_midi, pad_count) = job
+
+    preset_path_abs = os.path.join(out_dir, f"{kit_safe}.taldrum")
+
+    note_to_samples, warns = assign_samples_to_notes(
+        kit_elements, mapping, overflow_policy, base_trash_pool
+    )
+
+    pads = build_pads(
+        note_to_samples,
+        pad_base_midi,
+        pad_count,
+        out_dir,
+        global_base_abs,
+    )
+    xml_bytes = make_taldrum_xml(preset_path_abs, kit_safe, pads).encode("utf-8")
+    write_file_atomic(preset_path_abs, xml_bytes)
+
+    return preset_path_abs
+
+
 def main():
     p = argparse.ArgumentParser(description="Generate TAL Drum kits")
 
@@ -326,41 +445,24 @@ def main():
     mapping = parse_mapping_file(args.mapping)
 
     ensure_dir(args.output_dir)
-    out_dir = os.path.abspath(args.output_dir)
+    out_dir = os.path.abspath(args.output_dir)  # also every preset's dir
+    global_base_abs = os.path.abspath(args.global_sample_base)
 
     trash_notes = parse_midi_note_list(args.trash_notes)
-
-    for kit_name, kit_elements in listing.items():
-        kit_safe = sanitize_filename(kit_name)
-        preset_path = os.path.join(out_dir, f"{kit_safe}.taldrum")
-        preset_path_abs = os.path.abspath(preset_path)
-
-        root = make_empty_taldrum_root(preset_path_abs, kit_safe)
-        midi_to_pad = build_base_pads(root, args.pad_base_midi, args.pad_count)
-
-        note_to_samples, warns = assign_samples_to_notes(
-            kit_elements, mapping, args.overflow_policy, trash_notes
-        )
-
-        for note, files in note_to_samples.items():
-            pad_el = midi_to_pad.get(note)
-            if pad_el is None:  # ✅ no more DeprecationWarning
-                continue
-
-            set_pad_layers(
-                pad_el,
-                files[:LAYER_LIMIT_PER_PAD],
-                os.path.dirname(preset_path_abs),
-                args.global_sample_base
-            )
-
-            # 🎨 Apply visible random colour
-            pad_el.set("colour", random_pad_colour())
-
-        xml_text = pretty_xml(root)
-
-        with open(preset_path_abs, "w", encoding="utf-8") as f:
-            f.write(xml_text)
+    base_trash_pool = free_trash_notes(mapping, trash_notes)
+
+    # Kits are independent: one job each, spread over all cores.
+    # Names are made unique first so no two workers write the same file.
+    kit_names = unique_preset_names(listing, is_case_insensitive_dir(out_dir))
+    jobs = [
+        (kit_safe, kit_elements, mapping, args.overflow_policy, base_trash_pool,
+         out_dir, global_base_abs, args.pad_base_midi, args.pad_count)
+        for kit_safe, kit_elements in zip(kit_names, listing.values())
+    ]
+
+    with multiprocessing.Pool() as pool:
+        for _ in pool.imap_unordered(_generate_one, jobs, chunksize=16):
+            pass
 
     print(f"Generation complete → {out_dir}")
 